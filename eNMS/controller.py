@@ -172,7 +172,10 @@ class Controller:
 
     def calendar_init(self, type):
         results, properties = {}, ["id", "name", "runtime", "service_properties"]
-        for instance in db.fetch_all(type):
+        instances = db.fetch_all(type)
+        if type == "task":
+            vs.models["task"].populate_status(instances)
+        for instance in instances:
             if getattr(instance, "workflow", None):
                 continue
             date = getattr(instance, "next_run_time" if type == "task" else "runtime")
@@ -448,6 +451,8 @@ class Controller:
             )
         except OperationalError:
             return {"error": "Invalid regular expression as search parameter."}
+        if model == "task":
+            table.populate_status(query_data)
         table_result = {
             "draw": int(kwargs["draw"]),
             "recordsTotal": total_records,
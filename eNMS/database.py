@@ -231,6 +231,19 @@ class Database:
     def configure_model_events(self, env):
         env.log_events = True
 
+        @event.listens_for(self.session, "before_commit")
+        def flush_changelog(session):
+            env.flush_changelog(session)
+
+        @event.listens_for(self.session, "after_soft_rollback")
+        def discard_changelog(session, previous_transaction):
+            env.clear_changelog()
+
+        @event.listens_for(self.session, "after_transaction_end")
+        def discard_closed_changelog(session, transaction):
+            if transaction.parent is None:
+                env.clear_changelog()
+
         @event.listens_for(self.base, "after_insert", propagate=True)
         def log_instance_creation(mapper, connection, target):
             if not getattr(target, "log_change", True) or not env.log_events:
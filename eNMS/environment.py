@@ -1,58 +1,29 @@
 from base64 import b64decode, b64encode
 from click import get_current_context
 from collections import defaultdict
-from cryptography.fernet import Fernet
-from dramatiq.brokers.redis import RedisBroker
-from dramatiq import set_broker
-from email.mime.application import MIMEApplication
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.utils import formatdate
 from flask_login import current_user
 from importlib import import_module
 from json import load
 from logging.config import dictConfig
 from logging import getLogger, info
 from os import getenv, getpid
-from passlib.hash import argon2
 from pathlib import Path
 from psutil import Process
-from redis import Redis
-from redis.exceptions import ConnectionError, TimeoutError
-from requests import Session as RequestSession
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
-from smtplib import SMTP
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import StaleDataError
 from sys import path as sys_path
-from threading import Thread
-from traceback import format_exc
+from threading import local, Thread
 from warnings import warn
 from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 
-try:
-    from hvac import Client as VaultClient
-except ImportError:
-    warn(f"Couldn't import hvac module ({format_exc()})")
-
-try:
-    from ldap3 import Server
-except ImportError as exc:
-    warn(f"Couldn't import ldap3 module ({exc})")
-
-try:
-    from tacacs_plus.client import TACACSClient
-except ImportError as exc:
-    warn(f"Couldn't import tacacs_plus module ({exc})")
-
 from eNMS.database import db
 from eNMS.variables import vs
 
 
 class Environment:
     def __init__(self):
+        self.changelog_buffer = local()
         self.init_authentication()
         self.init_encryption()
         self.use_vault = vs.settings["vault"]["use_vault"]
@@ -125,7 +96,7 @@ class Environment:
             if not user:
                 return False
             user_password = self.get_password(user.password)
-            success = user and user_password and argon2.verify(password, user_password)
+            success = user_password and self.verify_password(user_password, password)
             return user if success else False
         else:
             authentication_function = getattr(vs.custom, f"{method}_authentication")
@@ -145,15 +116,24 @@ class Environment:
 
     def encrypt_password(self, password):
         if isinstance(password, str):
-            password = str.encode(password)
+            password = password.encode()
         return self.encrypt(password)
 
     def get_password(self, password):
         if not password:
             return
-        if self.fernet_encryption and isinstance(password, str):
-            password = str.encode(password)
-        return str(self.decrypt(password), "utf-8")
+        if isinstance(password, str):
+            password = password.encode()
+        return self.decrypt(password).decode()
+
+    def hash_password(self, password):
+        return self.password_hasher.hash(password)
+
+    def verify_password(self, hash, password):
+        try:
+            return self.password_hasher.verify(hash, password)
+        except self.password_hasher_exceptions:
+            return False
 
     def get_ssh_port(self):
         if self.redis_queue:
@@ -168,24 +148,39 @@ class Environment:
         ldap_address, tacacs_address = getenv("LDAP_ADDR"), getenv("TACACS_ADDR")
         try:
             if ldap_address:
-                self.ldap_server = Server(getenv("LDAP_ADDR"))
+                from ldap3 import Server
+
+                self.ldap_server = Server(ldap_address)
             if tacacs_address:
+                from tacacs_plus.client import TACACSClient
+
                 self.tacacs_client = TACACSClient(
-                    getenv("TACACS_ADDR"), 49, getenv("TACACS_PASSWORD")
+                    tacacs_address, 49, getenv("TACACS_PASSWORD")
                 )
-        except NameError as exc:
+        except ImportError as exc:
             warn(f"Module missing ({exc})")
 
     def init_connection_pools(self):
+        from requests import Session as RequestSession
+        from requests.adapters import HTTPAdapter
+        from requests.packages.urllib3.util.retry import Retry
+
         self.request_session = RequestSession()
+        self.scheduler_session = RequestSession()
         retry = Retry(**vs.settings["requests"]["retries"])
         for protocol in ("http", "https"):
             self.request_session.mount(
                 f"{protocol}://",
                 HTTPAdapter(max_retries=retry, **vs.settings["requests"]["pool"]),
             )
+            self.scheduler_session.mount(
+                f"{protocol}://", HTTPAdapter(**vs.settings["requests"]["pool"])
+            )
 
     def init_dramatiq(self):
+        from dramatiq import set_broker
+        from dramatiq.brokers.redis import RedisBroker
+
         set_broker(
             RedisBroker(
                 host=getenv("REDIS_ADDR"),
@@ -198,8 +193,17 @@ class Environment:
         )
 
     def init_encryption(self):
+        from argon2 import PasswordHasher, Type
+        from argon2.exceptions import InvalidHash, VerificationError
+
+        self.password_hasher = PasswordHasher(
+            type=Type.ID, **vs.settings["authentication"]["argon2"]
+        )
+        self.password_hasher_exceptions = (InvalidHash, VerificationError)
         self.fernet_encryption = getenv("FERNET_KEY")
         if self.fernet_encryption:
+            from cryptography.fernet import Fernet
+
             fernet = Fernet(self.fernet_encryption)
             self.encrypt, self.decrypt = fernet.encrypt, fernet.decrypt
         else:
@@ -219,13 +223,19 @@ class Environment:
     def init_redis(self):
         host = getenv("REDIS_ADDR")
         if not host:
-            self.redis_queue = None
+            self.redis_queue, self.redis_exceptions = None, ()
         else:
+            from redis import Redis
+            from redis.exceptions import ConnectionError, TimeoutError
+
+            self.redis_exceptions = (ConnectionError, TimeoutError)
             self.redis_queue = Redis(host=host, **vs.settings["redis"]["config"])
             if vs.settings["redis"]["flush_on_restart"]:
                 self.redis_queue.flushdb()
 
     def init_vault_client(self):
+        from hvac import Client as VaultClient
+
         url = getenv("VAULT_ADDR", "http://127.0.0.1:8200")
         self.vault_client = VaultClient(url=url, token=getenv("VAULT_TOKEN"))
         if self.vault_client.sys.is_sealed() and vs.settings["vault"]["unseal_vault"]:
@@ -240,22 +250,36 @@ class Environment:
         if logger:
             getattr(getLogger(logger), severity)(content)
         if change_log or logger and logger_settings.get("change_log"):
-            db.factory(
-                "changelog",
-                **{
-                    "severity": severity,
-                    "content": content,
-                    "user": user or getattr(current_user, "name", ""),
-                },
-            )
+            changelog = {
+                "type": "changelog",
+                "time": vs.get_time(),
+                "severity": severity,
+                "content": content,
+                "user": user or getattr(current_user, "name", ""),
+            }
+            changelogs = self.changelog_buffer.__dict__.setdefault("changelogs", [])
+            changelogs.append(changelog)
         return logger_settings
 
+    def clear_changelog(self):
+        self.changelog_buffer.__dict__.pop("changelogs", None)
+
+    def flush_changelog(self, session):
+        session.flush()
+        changelogs = self.changelog_buffer.__dict__.pop("changelogs", [])
+        if changelogs:
+            session.execute(vs.models["changelog"].__table__.insert(), changelogs)
+
     def log_queue(self, runtime, service, log=None, mode="add", start_line=0):
         if self.redis_queue:
             key = f"{runtime}/{service}/logs"
             vs.run_logs[runtime][int(service)] = None
             if mode == "add":
-                log = self.redis("lpush", key, log)
+                try:
+                    log = self.redis_queue.lpush(key, log)
+                except self.redis_exceptions as exc:
+                    error = f"Redis Queue Unreachable ({exc})"
+                    self.log("error", error, change_log=False)
             else:
                 log = self.redis("lrange", key, 0, -1)
                 if log:
@@ -268,10 +292,19 @@ class Environment:
                 log = full_log[start_line:]
         return log
 
+    def redis_delete(self, pattern):
+        try:
+            pipeline = self.redis_queue.pipeline()
+            for key in self.redis_queue.scan_iter(match=pattern):
+                pipeline.delete(key)
+            pipeline.execute()
+        except self.redis_exceptions as exc:
+            self.log("error", f"Redis Queue Unreachable ({exc})", change_log=False)
+
     def redis(self, operation, *args, **kwargs):
         try:
             return getattr(self.redis_queue, operation)(*args, **kwargs)
-        except (ConnectionError, TimeoutError) as exc:
+        except self.redis_exceptions as exc:
             self.log("error", f"Redis Queue Unreachable ({exc})", change_log=False)
 
     def send_email(
@@ -285,25 +318,34 @@ class Environment:
         file_content=None,
         content_type="plain",
     ):
+        from email.message import EmailMessage
+        from email.utils import formatdate
+        from smtplib import SMTP
+
         sender = sender or vs.settings["mail"]["sender"]
-        message = MIMEMultipart()
+        message = EmailMessage()
         message["From"] = sender
         message["To"] = recipients
         message["Date"] = formatdate(localtime=True)
         message["Subject"] = subject
-        message.add_header("reply-to", reply_to or vs.settings["mail"]["reply_to"])
-        message.attach(MIMEText(content, content_type))
+        message["Reply-To"] = reply_to or vs.settings["mail"]["reply_to"]
+        message.set_content(content, subtype=content_type)
         if filename:
-            attached_file = MIMEApplication(file_content, Name=filename)
-            attached_file["Content-Disposition"] = f'attachment; filename="{filename}"'
-            message.attach(attached_file)
+            if isinstance(file_content, str):
+                file_content = file_content.encode()
+            message.add_attachment(
+                file_content,
+                maintype="application",
+                subtype="octet-stream",
+                filename=filename,
+            )
         smtp_args = (vs.settings["mail"]["server"], vs.settings["mail"]["port"])
         with SMTP(*smtp_args) as server:
             if vs.settings["mail"]["use_tls"]:
                 server.starttls()
                 password = getenv("MAIL_PASSWORD", "")
                 server.login(vs.settings["mail"]["username"], password)
-            server.sendmail(sender, recipients.split(","), message.as_string())
+            server.send_message(message, sender, recipients.split(","))
 
 
 env = Environment()
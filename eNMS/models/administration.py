@@ -3,7 +3,6 @@ from datetime import datetime
 from itertools import chain
 from os import kill, makedirs
 from os.path import exists, getmtime
-from passlib.hash import argon2
 from pathlib import Path
 from shutil import move, rmtree
 from signal import SIGTERM
@@ -113,7 +112,7 @@ class User(AbstractBase, UserMixin):
 
     def update(self, **kwargs):
         if kwargs.get("password") and not kwargs["password"].startswith("$argon2i"):
-            kwargs["password"] = argon2.hash(kwargs["password"])
+            kwargs["password"] = env.hash_password(kwargs["password"])
         super().update(**kwargs)
 
     def update_rbac(self):
@@ -1,21 +1,20 @@
 from copy import deepcopy
 from flask_login import current_user
 from functools import wraps
+from itertools import count
 from os import environ, getpid
-from requests import get, post
+from re import compile as compile_regex, escape
 from requests.exceptions import ConnectionError, MissingSchema, ReadTimeout
 from sqlalchemy import Boolean, case, ForeignKey, Integer
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import deferred, relationship
 
-from eNMS.controller import controller
 from eNMS.database import db
 from eNMS.environment import env
 from eNMS.models.base import AbstractBase
 from eNMS.models.inventory import Device  # noqa: F401
 from eNMS.models.administration import User  # noqa: F401
-from eNMS.runner import Runner
 from eNMS.variables import vs
 
 
@@ -176,23 +175,34 @@ class Service(AbstractBase):
             ancestor.last_modified_by = self.last_modified_by
 
     def get_ancestors(self):
-        def rec(service):
-            return {service} | set().union(*(rec(w) for w in service.workflows))
-
-        return rec(self)
+        ancestors, stack = set(), [self]
+        while stack:
+            service = stack.pop()
+            if service in ancestors:
+                continue
+            ancestors.add(service)
+            stack.extend(service.workflows)
+        return ancestors
 
     def duplicate(self, workflow=None):
-        index = 0
-        while True:
-            number = f" ({index})" if index else ""
-            scoped_name = f"{self.scoped_name}{number}"
-            name = f"[{workflow.name}] {scoped_name}" if workflow else scoped_name
-            if not db.fetch("service", allow_none=True, name=name):
-                service = super().duplicate(
-                    name=name, scoped_name=scoped_name, shared=False
-                )
-                break
-            index += 1
+        model = vs.models["service"]
+        name = f"[{workflow.name}] {self.scoped_name}" if workflow else self.scoped_name
+        regex = compile_regex(rf"{escape(name)}(?: \(([1-9]\d*)\))?")
+        existing_names = db.session.query(model.name).filter(
+            model.name.startswith(name, autoescape=True)
+        )
+        used_indexes = set()
+        for (existing_name,) in existing_names:
+            match = regex.fullmatch(existing_name)
+            if match:
+                used_indexes.add(int(match.group(1) or 0))
+        index = next(index for index in count() if index not in used_indexes)
+        number = f" ({index})" if index else ""
+        service = super().duplicate(
+            name=f"{name}{number}",
+            scoped_name=f"{self.scoped_name}{number}",
+            shared=False,
+        )
         if workflow:
             workflow.services.append(service)
         service.set_name()
@@ -211,11 +221,6 @@ class Service(AbstractBase):
             workflow = f"[{self.workflows[0].name}] "
         self.name = f"{workflow}{name or self.scoped_name}"
 
-    def neighbors(self, workflow, subtype):
-        for edge in self.destinations:
-            if edge.subtype == subtype and edge.workflow.name == workflow.name:
-                yield edge
-
 
 class ConnectionService(Service):
     __tablename__ = "connection_service"
@@ -249,29 +254,23 @@ class Result(AbstractBase):
     parent_runtime = db.Column(db.TinyString, index=True)
     parent_service_id = db.Column(Integer, ForeignKey("service.id", ondelete="cascade"))
     parent_service = relationship("Service", foreign_keys="Result.parent_service_id")
-    parent_service_name = association_proxy(
-        "service", "scoped_name", info={"name": "parent_service_name"}
-    )
+    parent_service_name = db.Column(db.SmallString, index=True)
     parent_device_id = db.Column(Integer, ForeignKey("device.id", ondelete="cascade"))
     parent_device = relationship("Device", uselist=False, foreign_keys=parent_device_id)
-    parent_device_name = association_proxy("parent_device", "name")
+    parent_device_name = db.Column(db.SmallString, index=True)
     device_id = db.Column(Integer, ForeignKey("device.id", ondelete="cascade"))
     device = relationship(
         "Device", uselist=False, foreign_keys=device_id, lazy="joined"
     )
-    device_name = association_proxy("device", "name")
+    device_name = db.Column(db.SmallString, index=True)
     service_id = db.Column(
         Integer, ForeignKey("service.id", ondelete="cascade"), index=True
     )
     service = relationship("Service", foreign_keys="Result.service_id")
-    service_name = association_proxy(
-        "service", "scoped_name", info={"name": "service_name"}
-    )
+    service_name = db.Column(db.SmallString, index=True)
     workflow_id = db.Column(Integer, ForeignKey("workflow.id", ondelete="cascade"))
     workflow = relationship("Workflow", foreign_keys="Result.workflow_id")
-    workflow_name = association_proxy(
-        "workflow", "scoped_name", info={"name": "workflow_name"}
-    )
+    workflow_name = db.Column(db.SmallString, index=True)
 
     def __getitem__(self, key):
         return self.result[key]
@@ -411,12 +410,9 @@ class Run(AbstractBase):
         if self.state:
             return self.state
         elif env.redis_queue:
-            keys = env.redis("keys", f"{self.runtime}/state/*")
-            if not keys:
-                return {}
-            data, state = list(zip(keys, env.redis("mget", *keys))), {}
-            for log, value in data:
-                inner_store, (*path, last_key) = state, log.split("/")[2:]
+            data, state = env.redis("hgetall", f"{self.runtime}/state") or {}, {}
+            for log, value in data.items():
+                inner_store, (*path, last_key) = state, log.split("/")
                 for key in path:
                     inner_store = inner_store.setdefault(key, {})
                 if value in ("False", "True"):
@@ -440,6 +436,9 @@ class Run(AbstractBase):
             return "N/A"
 
     def run(self):
+        from eNMS.controller import controller
+        from eNMS.runner import Runner
+
         worker = db.factory(
             "worker",
             name=str(getpid()),
@@ -519,7 +518,7 @@ class Task(AbstractBase):
             self.schedule(mode="schedule" if self.is_active else "pause")
 
     def delete(self):
-        post(f"{vs.scheduler_address}/delete_job/{self.id}")
+        env.scheduler_session.post(f"{vs.scheduler_address}/delete_job/{self.id}")
 
     @hybrid_property
     def status(self):
@@ -541,23 +540,59 @@ class Task(AbstractBase):
 
         return wrapper
 
+    @classmethod
+    def populate_status(cls, tasks):
+        if not tasks:
+            return
+        try:
+            status = env.scheduler_session.post(
+                f"{vs.scheduler_address}/status_batch",
+                json=[task.id for task in tasks],
+                timeout=0.01 * len(tasks),
+            ).json()
+        except (ConnectionError, MissingSchema):
+            unreachable = "Scheduler Unreachable"
+            status = {
+                str(task.id): {
+                    "next_run_time": unreachable,
+                    "time_before_next_run": unreachable,
+                }
+                for task in tasks
+            }
+        except Exception:
+            return
+        if not isinstance(status, dict):
+            return
+        for task in tasks:
+            task.scheduler_status = status.get(str(task.id), {})
+
     @property
     @_catch_request_exceptions
     def next_run_time(self):
-        return get(
+        scheduler_status = getattr(self, "scheduler_status", {})
+        if "next_run_time" in scheduler_status:
+            return scheduler_status.pop("next_run_time")
+        return env.scheduler_session.get(
             f"{vs.scheduler_address}/next_runtime/{self.id}", timeout=0.01
         ).json()
 
     @property
     @_catch_request_exceptions
     def time_before_next_run(self):
-        return get(f"{vs.scheduler_address}/time_left/{self.id}", timeout=0.01).json()
+        scheduler_status = getattr(self, "scheduler_status", {})
+        if "time_before_next_run" in scheduler_status:
+            return scheduler_status.pop("time_before_next_run")
+        return env.scheduler_session.get(
+            f"{vs.scheduler_address}/time_left/{self.id}", timeout=0.01
+        ).json()
 
     @_catch_request_exceptions
     def schedule(self, mode="schedule"):
         try:
             payload = {"mode": mode, "task": self.get_properties()}
-            result = post(f"{vs.scheduler_address}/schedule", json=payload).json()
+            result = env.scheduler_session.post(
+                f"{vs.scheduler_address}/schedule", json=payload
+            ).json()
             self.last_scheduled_by = current_user.name
         except ConnectionError:
             return {"alert": "Scheduler Unreachable: the task cannot be scheduled."}
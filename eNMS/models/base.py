@@ -1,6 +1,6 @@
 from collections import defaultdict
 from flask_login import current_user
-from sqlalchemy import or_
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.mutable import MutableDict, MutableList
 from sqlalchemy.sql.expression import false
 
@@ -8,46 +8,44 @@ from eNMS.database import db
 from eNMS.environment import env
 from eNMS.variables import vs
 
+MISSING = object()
+
 
 class AbstractBase(db.base):
     __abstract__ = True
     model_properties = {}
+    serialized_properties = {}
+    serialized_relations = {}
+    property_updaters = {}
 
     def __init__(self, **kwargs):
         self.update(**kwargs)
         self.update_rbac()
 
-    def __lt__(self, other):
-        return True
-
     def __repr__(self):
         return str(getattr(self, "name", self.id))
 
-    def __getattribute__(self, property):
-        if property in vs.private_properties_set:
-            if env.use_vault:
-                target = self.service if self.type == "run" else self
-                path = f"secret/data/{target.type}/{target.name}/{property}"
-                data = env.vault_client.read(path)
-                value = data["data"]["data"][property] if data else ""
-            else:
-                value = super().__getattribute__(property)
-            return value
-        else:
-            return super().__getattribute__(property)
+    if env.use_vault:
+
+        def __getattribute__(self, property):
+            if property not in vs.private_properties_set:
+                return super().__getattribute__(property)
+            target = self.service if self.type == "run" else self
+            path = f"secret/data/{target.type}/{target.name}/{property}"
+            data = env.vault_client.read(path)
+            return data["data"]["data"][property] if data else ""
 
     def __setattr__(self, property, value):
-        if property in vs.private_properties_set:
-            if not value:
-                return
-            value = env.encrypt_password(value).decode("utf-8")
-            if env.use_vault:
-                env.vault_client.write(
-                    f"secret/data/{self.type}/{self.name}/{property}",
-                    data={property: value},
-                )
-            else:
-                super().__setattr__(property, value)
+        if property not in vs.private_properties_set:
+            return super().__setattr__(property, value)
+        if not value:
+            return
+        value = env.encrypt_password(value).decode("utf-8")
+        if env.use_vault:
+            env.vault_client.write(
+                f"secret/data/{self.type}/{self.name}/{property}",
+                data={property: value},
+            )
         else:
             super().__setattr__(property, value)
 
@@ -68,31 +66,59 @@ class AbstractBase(db.base):
 
     def update(self, rbac="edit", **kwargs):
         self.filter_rbac_kwargs(kwargs)
-        relation = vs.relationships[self.__tablename__]
+        updaters = self.get_updaters()
         for property, value in kwargs.items():
-            if not hasattr(self, property):
-                continue
-            property_type = vs.model_properties[self.__tablename__].get(property, None)
-            if property in relation:
-                if relation[property]["list"]:
-                    value = db.objectify(relation[property]["model"], value, rbac=None)
-                elif value:
-                    value = db.fetch(relation[property]["model"], id=value, rbac=None)
-            if property_type == "bool":
-                value = value not in (False, "false")
-            elif property_type == "dict":
-                table_properties = vs.properties["custom"].get(self.__tablename__, {})
-                if table_properties.get(property, {}).get("merge_update"):
-                    current_value = getattr(self, property)
-                    if current_value:
-                        value = {**current_value, **value}
-            setattr(self, property, value)
+            if property in updaters:
+                updaters[property](self, property, value)
+            elif hasattr(self, property):
+                setattr(self, property, value)
         if getattr(self, "class_type", None) not in vs.rbac["rbac_models"]:
             return
+        read_groups = set(self.rbac_read)
         for group in db.fetch_all("group", force_read_access=True, rbac=None):
-            if group not in self.rbac_read:
+            if group not in read_groups:
                 self.rbac_read.append(group)
 
+    def get_updaters(self):
+        table = self.__tablename__
+        if table in self.property_updaters:
+            return self.property_updaters[table]
+
+        def update_bool(instance, property, value):
+            setattr(instance, property, value not in (False, "false"))
+
+        def update_dict(instance, property, value):
+            current_value = getattr(instance, property)
+            setattr(
+                instance,
+                property,
+                {**current_value, **value} if current_value else value,
+            )
+
+        def relation_updater(model, is_list):
+            def update_list(instance, property, value):
+                setattr(instance, property, db.objectify(model, value, rbac=None))
+
+            def update_scalar(instance, property, value):
+                if value:
+                    value = db.fetch(model, id=value, rbac=None)
+                setattr(instance, property, value)
+
+            return update_list if is_list else update_scalar
+
+        updaters = {}
+        table_properties = vs.properties["custom"].get(table, {})
+        for property, property_type in vs.model_properties[table].items():
+            if property_type == "bool":
+                updaters[property] = update_bool
+            elif property_type == "dict":
+                if table_properties.get(property, {}).get("merge_update"):
+                    updaters[property] = update_dict
+        for property, relation in vs.relationships[table].items():
+            updaters[property] = relation_updater(relation["model"], relation["list"])
+        self.property_updaters[table] = updaters
+        return updaters
+
     def update_last_modified_properties(self):
         self.last_modified = vs.get_time()
         self.last_modified_by = getattr(current_user, "name", "admin")
@@ -112,15 +138,15 @@ class AbstractBase(db.base):
         model = join_class or getattr(cls, "class_type", None)
         if model not in vs.rbac["rbac_models"]:
             return query
-        if join_class:
-            query = query.join(getattr(cls, join_class))
-        user_group = [group.id for group in user.groups]
         property = getattr(vs.models[model], f"rbac_{mode}")
-        rbac_constraint = property.any(vs.models["group"].id.in_(user_group))
+        rbac_constraint = property.any(vs.models["group"].users.any(id=user.id))
         owners_constraint = vs.models[model].owners.any(id=user.id)
+        constraint = or_(owners_constraint, rbac_constraint)
         if hasattr(vs.models[model], "admin_only"):
-            query = query.filter(vs.models[model].admin_only == false())
-        return query.filter(or_(owners_constraint, rbac_constraint))
+            constraint = and_(vs.models[model].admin_only == false(), constraint)
+        if join_class:
+            constraint = getattr(cls, join_class).has(constraint)
+        return query.filter(constraint)
 
     def update_rbac(self):
         model = getattr(self, "class_type", None)
@@ -140,22 +166,13 @@ class AbstractBase(db.base):
         self, export=False, exclude=None, include=None, private_properties=False
     ):
         result = {}
-        no_migrate = db.dont_migrate.get(getattr(self, "export_type", self.type), {})
-        properties = list(vs.model_properties[self.type])
-        for property in properties:
+        for property in self.get_serialized_properties(export):
             if not private_properties and property in vs.private_properties_set:
                 continue
-            if property in db.dont_serialize.get(self.type, []):
-                continue
-            if export and property in getattr(self, "model_properties", {}):
-                continue
             if include and property not in include or exclude and property in exclude:
                 continue
-            if export and property in no_migrate:
-                continue
-            try:
-                value = getattr(self, property)
-            except AttributeError:
+            value = getattr(self, property, MISSING)
+            if value is MISSING:
                 continue
             if export:
                 if isinstance(value, MutableList):
@@ -167,6 +184,34 @@ class AbstractBase(db.base):
             result[property] = value
         return result
 
+    def get_serialized_properties(self, export=False):
+        key = (self.type, export)
+        if key not in self.serialized_properties:
+            dont_serialize = db.dont_serialize.get(self.type, [])
+            export_type = getattr(self, "export_type", self.type)
+            no_migrate = db.dont_migrate.get(export_type, {}) if export else {}
+            model_properties = getattr(self, "model_properties", {}) if export else {}
+            self.serialized_properties[key] = tuple(
+                property
+                for property in vs.model_properties[self.type]
+                if property not in dont_serialize
+                and property not in model_properties
+                and property not in no_migrate
+            )
+        return self.serialized_properties[key]
+
+    def get_serialized_relations(self, export=False):
+        key = (self.type, export)
+        if key not in self.serialized_relations:
+            export_type = getattr(self, "export_type", self.type)
+            no_migrate = db.dont_migrate.get(export_type, {}) if export else {}
+            self.serialized_relations[key] = tuple(
+                (property, relation["list"])
+                for property, relation in vs.relationships[self.type].items()
+                if property not in no_migrate
+            )
+        return self.serialized_relations[key]
+
     def table_properties(self, **kwargs):
         displayed = [column["data"] for column in kwargs["columns"]]
         table_type = getattr(self, "class_type", self.type)
@@ -194,27 +239,20 @@ class AbstractBase(db.base):
         properties = self.get_properties(
             export, exclude=exclude, private_properties=private_properties
         )
-        no_migrate = db.dont_migrate.get(getattr(self, "export_type", self.type), {})
-        for property, relation in vs.relationships[self.type].items():
+        names_only = export or relation_names_only
+        for property, is_list in self.get_serialized_relations(export):
             if include and property not in include or exclude and property in exclude:
                 continue
-            if export and property in no_migrate:
-                continue
             value = getattr(self, property)
-            if relation["list"]:
-                properties[property] = [
-                    obj.name
-                    if export or relation_names_only
-                    else obj.get_properties(exclude=exclude)
-                    for obj in value
-                ]
-            else:
-                if not value:
-                    continue
+            if is_list:
+                properties[property] = (
+                    [obj.name for obj in value]
+                    if names_only
+                    else [obj.get_properties(exclude=exclude) for obj in value]
+                )
+            elif value:
                 properties[property] = (
-                    value.name
-                    if export or relation_names_only
-                    else value.get_properties(exclude=exclude)
+                    value.name if names_only else value.get_properties(exclude=exclude)
                 )
         return properties
 
@@ -1,6 +1,7 @@
 from collections import defaultdict
-from heapq import heappop, heappush
-from sqlalchemy import Boolean, ForeignKey, Integer
+from heapq import heapify, heappop, heappush
+from itertools import chain, count
+from sqlalchemy import Boolean, ForeignKey, Integer, select
 from sqlalchemy.orm import backref, relationship
 from sqlalchemy.schema import UniqueConstraint
 from wtforms.validators import NumberRange
@@ -86,7 +87,7 @@ class Workflow(Service):
             if old_name in service.positions:
                 service.positions[self.name] = service.positions[old_name]
         for edge in self.edges:
-            edge.name.replace(old_name, self.name)
+            edge.name = edge.name.replace(f"[{old_name}]", f"[{self.name}]", 1)
 
     def duplicate(self, workflow=None, clone=None):
         if not clone:
@@ -106,7 +107,7 @@ class Workflow(Service):
             )
             service_clone.skip[clone.name] = service.skip.get(self.name, False)
             clone_services[service.id] = service_clone
-        db.session.commit()
+        db.session.flush()
         for edge in self.edges:
             clone.edges.append(
                 db.factory(
@@ -120,76 +121,149 @@ class Workflow(Service):
                     },
                 )
             )
-            db.session.commit()
+        db.session.commit()
         clone.recursive_update()
         return clone
 
     @property
     def deep_services(self):
-        services = [
-            service.deep_services if service.type == "workflow" else [service]
-            for service in self.services
-        ]
-        return [self] + sum(services, [])
+        table, model = db.service_workflow_table, vs.models["service"]
+        services = (
+            select(table.c.service_id)
+            .where(table.c.workflow_id == self.id)
+            .cte(recursive=True)
+        )
+        services = services.union(
+            select(table.c.service_id).join(
+                services, table.c.workflow_id == services.c.service_id
+            )
+        )
+        query = db.session.query(model).filter(
+            model.id.in_(select(services.c.service_id))
+        )
+        return [self, *query.all()]
 
     @property
     def deep_edges(self):
-        edges = [
-            workflow.edges
-            for workflow in set(self.deep_services)
-            if workflow.type == "workflow"
-        ]
-        return sum(edges, [])
+        return list(
+            chain.from_iterable(
+                workflow.edges
+                for workflow in self.deep_services
+                if workflow.type == "workflow"
+            )
+        )
+
+    def get_default_service(self, scoped_name):
+        for service in self.services:
+            if service.shared and service.scoped_name == scoped_name:
+                return service
+        return db.fetch("service", scoped_name=scoped_name, rbac=None)
 
     def job(self, run, device=None):
-        number_of_runs = defaultdict(int)
-        start = db.fetch("service", scoped_name="Start", rbac=None)
-        end = db.fetch("service", scoped_name="End", rbac=None)
-        services, targets = [], defaultdict(set)
+        device_index, device_names = {}, []
+
+        def get_mask(names):
+            mask = 0
+            for name in names:
+                if name not in device_index:
+                    device_index[name] = len(device_names)
+                    device_names.append(name)
+                mask |= 1 << device_index[name]
+            return mask
+
+        def get_names(mask):
+            names = []
+            while mask:
+                lowest_bit = mask & -mask
+                names.append(device_names[lowest_bit.bit_length() - 1])
+                mask ^= lowest_bit
+            return names
+
+        def get_devices(names):
+            missing_devices = [name for name in names if name not in device_store]
+            query = db.query("device") if missing_devices else None
+            if query:
+                query = query.filter(vs.models["device"].name.in_(missing_devices))
+                device_store.update({device.name: device for device in query})
+            for name in missing_devices:
+                if name not in device_store:
+                    characteristics = {"name": name}
+                    raise db.rbac_error(
+                        "There is no device in the database "
+                        f"with the following characteristics: {characteristics}"
+                    )
+            return [device_store[name] for name in names]
+
+        start, end = self.get_default_service("Start"), self.get_default_service("End")
+        order = count()
         start_targets = [device] if device else run.target_devices
-        for service_id in run.start_services or [start.id]:
-            service = db.fetch("service", id=service_id, rbac=None)
-            targets[service.name] |= {device.name for device in start_targets}
-            heappush(services, (1 / service.priority, service))
-        visited, restart_run = set(), run.restart_run
+        start_services = (
+            db.session.query(vs.models["service"])
+            .filter(vs.models["service"].id.in_(run.start_services or [start.id]))
+            .all()
+        )
+        index, known_services = {}, (*self.services, *start_services, start, end)
+        for service_id in chain(
+            (service.id for service in known_services),
+            (edge.destination_id for edge in self.edges),
+        ):
+            index.setdefault(service_id, len(index))
+        number_of_runs, queued_runs = [0] * len(index), [0] * len(index)
+        targets = [0] * len(index)
+        start_mask = get_mask(device.name for device in start_targets)
+        for service in start_services:
+            targets[index[service.id]] |= start_mask
+            queued_runs[index[service.id]] += 1
+        services = [
+            (-service.priority, next(order), service) for service in start_services
+        ]
+        heapify(services)
+        visited, restart_run, neighbors = set(), run.restart_run, defaultdict(list)
+        for edge in self.edges:
+            neighbors[(edge.source_id, edge.subtype)].append(edge)
         tracking_bfs = run.run_method == "per_service_with_workflow_targets"
         device_store = {device.name: device for device in start_targets}
+        skip_map = {
+            service.id: service.skip.get(self.name, False) for service in self.services
+        }
+        payload, run_kwargs = run.payload, {
+            "workflow": self,
+            "restart_run": restart_run,
+            "parent": run,
+            "parent_runtime": run.parent_runtime,
+            "workflow_run_method": run.run_method,
+        }
+        if run.parent_device:
+            run_kwargs["parent_device"] = run.parent_device
         while services:
             if run.stop:
                 return {"success": False, "result": "Aborted"}
-            _, service = heappop(services)
-            if number_of_runs[service.name] >= service.maximum_runs:
+            *_, service = heappop(services)
+            service_index = index[service.id]
+            queued_runs[service_index] -= 1
+            if number_of_runs[service_index] >= service.maximum_runs:
                 continue
-            number_of_runs[service.name] += 1
+            number_of_runs[service_index] += 1
             visited.add(service)
-            if service in (start, end) or service.skip.get(self.name, False):
+            if service in (start, end) or skip_map.get(service.id, False):
                 success = service.skip_value == "success"
                 results = {"result": "skipped", "success": success}
                 if tracking_bfs or device:
                     results["summary"] = {
-                        "success": targets[service.name],
+                        "success": get_names(targets[service_index]),
                         "failure": [],
                     }
             else:
                 kwargs = {
+                    **run_kwargs,
                     "service": run.placeholder
                     if service.scoped_name == "Placeholder"
                     else service,
-                    "workflow": self,
-                    "restart_run": restart_run,
-                    "parent": run,
-                    "parent_runtime": run.parent_runtime,
-                    "workflow_run_method": run.run_method,
                 }
                 if tracking_bfs or device:
-                    kwargs["target_devices"] = []
-                    for name in targets[service.name]:
-                        if name not in device_store:
-                            device_store[name] = db.fetch("device", name=name)
-                        kwargs["target_devices"].append(device_store[name])
-                if run.parent_device:
-                    kwargs["parent_device"] = run.parent_device
-                results = Runner(run, payload=run.payload, **kwargs).results
+                    names = get_names(targets[service_index])
+                    kwargs["target_devices"] = get_devices(names)
+                results = Runner(run, payload=payload, **kwargs).results
                 if not results:
                     continue
             status = "success" if results["success"] else "failure"
@@ -199,13 +273,20 @@ class Workflow(Service):
             for edge_type in ("success", "failure"):
                 if not tracking_bfs and edge_type != status:
                     continue
-                if (tracking_bfs or device) and not summary[edge_type]:
-                    continue
-                for edge in service.neighbors(self, edge_type):
+                if tracking_bfs or device:
+                    if not summary[edge_type]:
+                        continue
+                    mask = get_mask(summary[edge_type])
+                for edge in neighbors.get((service.id, edge_type), ()):
                     successor = edge.destination
+                    next_index = index[successor.id]
                     if tracking_bfs or device:
-                        targets[successor.name] |= set(summary[edge_type])
-                    heappush(services, ((1 / successor.priority, successor)))
+                        targets[next_index] |= mask
+                    runs = number_of_runs[next_index] + queued_runs[next_index]
+                    if runs < successor.maximum_runs:
+                        queued_runs[next_index] += 1
+                        priority = -successor.priority
+                        heappush(services, (priority, next(order), successor))
                     if tracking_bfs or device:
                         run.write_state(
                             f"edges/{edge.id}", len(summary[edge_type]), "increment"
@@ -213,8 +294,9 @@ class Workflow(Service):
                     else:
                         run.write_state(f"edges/{edge.id}", "DONE")
         if tracking_bfs or device:
-            failed = list(targets[start.name] - targets[end.name])
-            summary = {"success": list(targets[end.name]), "failure": failed}
+            started, completed = targets[index[start.id]], targets[index[end.id]]
+            failed = get_names(started & ~completed)
+            summary = {"success": get_names(completed), "failure": failed}
             results = {"success": not failed, "summary": summary}
         else:
             results = {"success": end in visited}
@@ -204,8 +204,9 @@ class Runner:
             if isinstance(value, bool):
                 value = str(value)
             env.redis(
-                {None: "set", "append": "lpush", "increment": "incr"}[method],
-                f"{self.parent_runtime}/state/{self.path}/{path}",
+                {None: "hset", "increment": "hincrby"}[method],
+                f"{self.parent_runtime}/state",
+                f"{self.path}/{path}",
                 value,
             )
         else:
@@ -277,8 +278,7 @@ class Runner:
             if self.is_main_run or len(self.target_devices) > 1 or must_have_results:
                 results = self.create_result(results, run_result=self.is_main_run)
             if env.redis_queue and self.is_main_run:
-                runtime_keys = env.redis("keys", f"{self.parent_runtime}/*") or []
-                env.redis("delete", *runtime_keys)
+                env.redis_delete(f"{self.parent_runtime}/*")
             vs.custom.run_post_processing(self, results)
 
         self.results = results
@@ -468,18 +468,23 @@ class Runner:
         result_kw = {
             "parent_runtime": self.parent_runtime,
             "parent_service_id": self.main_run.service.id,
+            "parent_service_name": self.main_run.service.scoped_name,
             "path": self.path,
             "run_id": self.main_run.id,
             "service_id": self.service.id,
+            "service_name": self.service.scoped_name,
             "labels": self.main_run.labels,
             "creator": self.main_run.creator,
         }
         if self.workflow:
             result_kw["workflow_id"] = self.workflow.id
+            result_kw["workflow_name"] = self.workflow.scoped_name
         if self.parent_device:
             result_kw["parent_device_id"] = self.parent_device.id
+            result_kw["parent_device_name"] = self.parent_device.name
         if device:
             result_kw["device_id"] = device.id
+            result_kw["device_name"] = device.name
         if self.is_main_run and not device:
             self.payload = self.make_json_compliant(self.payload)
             results["payload"] = self.payload
@@ -496,11 +501,11 @@ class Runner:
                     rbac=None,
                 )
             if self.main_run.trigger == "REST API":
-                results["devices"] = {}
-                for result in self.main_run.results:
-                    if not result.device:
-                        continue
-                    results["devices"][result.device.name] = result.result
+                results["devices"] = {
+                    result.device_name: result.result
+                    for result in self.main_run.results
+                    if result.device_id
+                }
         else:
             results.pop("payload", None)
         create_failed_results = self.disable_result_creation and not self.success
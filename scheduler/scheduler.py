@@ -54,10 +54,7 @@ class Scheduler(Flask):
 
         @self.route("/next_runtime/<task_id>")
         def next_runtime(task_id):
-            job = self.scheduler.get_job(task_id)
-            if job and job.next_run_time:
-                return jsonify(job.next_run_time.strftime("%Y-%m-%d %H:%M:%S"))
-            return jsonify("Not Scheduled")
+            return jsonify(self.next_runtime(self.scheduler.get_job(task_id)))
 
         @self.route("/schedule", methods=["POST"])
         def schedule():
@@ -74,16 +71,36 @@ class Scheduler(Flask):
                 except JobLookupError:
                     return jsonify({"alert": "There is no such job scheduled."})
 
+        @self.route("/status_batch", methods=["POST"])
+        def status_batch():
+            status = {}
+            for task_id in request.json:
+                job = self.scheduler.get_job(str(task_id))
+                status[task_id] = {
+                    "next_run_time": self.next_runtime(job),
+                    "time_before_next_run": self.time_left(job),
+                }
+            return jsonify(status)
+
         @self.route("/time_left/<task_id>")
         def time_left(task_id):
-            job = self.scheduler.get_job(task_id)
-            if job and job.next_run_time:
-                delta = job.next_run_time.replace(tzinfo=None) - datetime.now()
-                hours, remainder = divmod(delta.seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                days = f"{delta.days} days, " if delta.days else ""
-                return jsonify(f"{days}{hours}h:{minutes}m:{seconds}s")
-            return jsonify("Not Scheduled")
+            return jsonify(self.time_left(self.scheduler.get_job(task_id)))
+
+    @staticmethod
+    def next_runtime(job):
+        if job and job.next_run_time:
+            return job.next_run_time.strftime("%Y-%m-%d %H:%M:%S")
+        return "Not Scheduled"
+
+    @staticmethod
+    def time_left(job):
+        if job and job.next_run_time:
+            delta = job.next_run_time.replace(tzinfo=None) - datetime.now()
+            hours, remainder = divmod(delta.seconds, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            days = f"{delta.days} days, " if delta.days else ""
+            return f"{days}{hours}h:{minutes}m:{seconds}s"
+        return "Not Scheduled"
 
     @staticmethod
     def run_service(task_id):